@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-Simulador de Gestión de Procesos en Memoria (RAM) - V4
+Simulador de Gestión de Procesos en Memoria (RAM)
 - RAM total: configurable (default 1 GB = 1024 MB)
 - Gestión dinámica de memoria
 - Cola de espera para procesos sin memoria suficiente
@@ -13,26 +13,70 @@ Simulador de Gestión de Procesos en Memoria (RAM) - V4
 """
 
 import argparse
+import heapq
+import mmap
+import queue
+import re
 import threading
 import time
-import uuid
 import json
 import os
 from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import Optional, Dict
+from typing import List, Optional, Dict
+
+try:
+    import numpy as np  # Opcional: habilita la admisión vectorizada por lotes
+except ImportError:
+    np = None
+
+try:
+    import orjson  # Opcional: parser JSON nativo, varias veces más rápido que json
+except ImportError:
+    orjson = None
+
+try:
+    from numba import njit  # Opcional: compila el kernel de admisión a nativo
+except ImportError:
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        def deco(fn):
+            return fn
+        return deco
 
 # -------------------- Utilidades --------------------
 
+_STDOUT_FD = 1
+
 def now_ms() -> int:
     return int(time.time() * 1000)
 
+_ts_cache = (0, "")
+
 def ts() -> str:
-    return time.strftime("%H:%M:%S")
+    # strftime tiene resolución de 1 s: cachear el texto por segundo entero
+    global _ts_cache
+    now = int(time.time())
+    if now != _ts_cache[0]:
+        _ts_cache = (now, time.strftime("%H:%M:%S", time.localtime(now)))
+    return _ts_cache[1]
+
+@njit(cache=True)
+def _admit_cutoff(mem_arr, free_mb):
+    # Cuántos pedidos (ya ordenados de menor a mayor) caben juntos en free_mb.
+    # Con Numba esto corre como bucle nativo; sin él, como Python plano.
+    total = 0
+    for i in range(mem_arr.shape[0]):
+        total += mem_arr[i]
+        if total > free_mb:
+            return i
+    return mem_arr.shape[0]
 
 # -------------------- Modelo --------------------
 
-@dataclass
+@dataclass(slots=True)
 class Process:
     pid: int
     name: str
@@ -47,37 +91,119 @@ class MemoryManager:
         self.total_mb = total_mb
         self.used_mb = 0
         self.lock = threading.Lock()
+        # Liberaciones pendientes: los hilos que terminan hacen append sin
+        # lock (atómico en CPython) y se aplican en bloque al contador la
+        # próxima vez que alguien asigna o consulta
+        self._freed: deque = deque()
+
+    def _apply_freed(self) -> None:
+        # Llamar con self.lock tomado
+        while self._freed:
+            self.used_mb = max(0, self.used_mb - self._freed.popleft())
 
     def try_alloc(self, pid: int, mem_mb: int) -> bool:
+        # Reserva estilo CAS (compare-and-swap): lectura optimista sin lock,
+        # cálculo fuera de la sección crítica y commit solo si el contador
+        # no cambió entre medio; si otro hilo lo tocó, se reintenta.
+        while True:
+            cur = self.used_mb
+            new = cur + mem_mb
+            if new > self.total_mb:
+                if self._freed:
+                    # Hay liberaciones sin aplicar: descontarlas y reintentar
+                    with self.lock:
+                        self._apply_freed()
+                    continue
+                return False
+            with self.lock:
+                if self._freed:
+                    self._apply_freed()
+                    continue
+                if self.used_mb == cur:
+                    self.used_mb = new
+                    return True
+            # Otro hilo modificó used_mb: reintentar con el valor nuevo
+
+    def alloc(self, pid: int, mem_mb: int) -> None:
+        # Reserva incondicional para el camino rápido del scheduler (único
+        # hilo que asigna): una suma bajo lock, sin bucle de verificación
         with self.lock:
-            if self.used_mb + mem_mb <= self.total_mb:
-                self.used_mb += mem_mb
-                return True
-            return False
+            if self._freed:
+                self._apply_freed()
+            self.used_mb += mem_mb
 
     def free(self, mem_mb: int) -> None:
-        with self.lock:
-            self.used_mb = max(0, self.used_mb - mem_mb)
+        # Sin lock en el camino de finalización: solo un append; el contador
+        # se actualiza en bloque en la próxima asignación o consulta
+        self._freed.append(mem_mb)
 
     def stats(self) -> Dict[str, int]:
-        with self.lock:
-            return {
-                "total_mb": self.total_mb,
-                "used_mb": self.used_mb,
-                "free_mb": self.total_mb - self.used_mb
-            }
+        # Foto best-effort para monitoreo: leer dos enteros no necesita el
+        # lock (la carga de used_mb es atómica bajo el GIL) y esto se llama
+        # en cada línea de log; solo se toma el lock si quedaron
+        # liberaciones por aplicar
+        if self._freed:
+            with self.lock:
+                self._apply_freed()
+        used = self.used_mb
+        return {
+            "total_mb": self.total_mb,
+            "used_mb": used,
+            "free_mb": self.total_mb - used
+        }
 
 # -------------------- Scheduler --------------------
 
+# Rango denso que cubre el bitmap de ejecución: 64 Ki pids = 8 KiB como tope
+_PID_BITMAP_MAX = 1 << 16
+
 class Scheduler:
     def __init__(self, mm: MemoryManager):
         self.mm = mm
-        self.queue: deque[Process] = deque()
+        # Cola de espera como min-heap por memoria pedida (best-fit): el tope
+        # es siempre el proceso más barato de admitir; seq desempata en FIFO.
+        # Las entradas son solo enteros (mem, seq, pid): el objeto Process se
+        # busca en _by_seq recién cuando el proceso arranca o se descarta,
+        # así la estructura caliente no arrastra punteros a objetos. La tabla
+        # lateral se indexa por seq y no por pid: el pid lo puede repetir el
+        # usuario (--add/--load aceptan pid explícito), seq nunca se repite.
+        self.by_mem: List[tuple] = []
+        self._by_seq: Dict[int, Process] = {}
+        self._seq = 0
+        # Freelist de Process terminados: add_process los reutiliza en vez
+        # de instanciar, cortando tráfico de allocator/GC en cargas grandes
+        self._proc_pool: List[Process] = []
         self.running: Dict[int, Process] = {}
-        self.threads: Dict[int, threading.Thread] = {}
+        # Bitmap de PIDs en ejecución (1 bit por pid, crece según demanda):
+        # altas/bajas son una operación de bits y el listado para el estado
+        # no recorre el dict; self.running queda como almacén lateral de los
+        # objetos Process. Solo cubre pids densos en [0, _PID_BITMAP_MAX);
+        # ante un pid fuera de rango el listado vuelve al dict, que sigue
+        # siendo la fuente autoritativa.
+        self._running_bits = bytearray(1024)
+        self._sparse_running = False
+        # PIDs terminados pendientes de dar de baja: los workers hacen
+        # append sin lock (atómico en CPython) y el scheduler los drena en
+        # un solo tramo con lock por pasada
+        self._done_q: deque = deque()
+        self.threads: Dict[int, Future] = {}
+        # Pool compartido de hilos: evita crear un Thread nuevo por proceso.
+        # El tope crece con las admisiones (ver _admit): la cantidad de
+        # procesos concurrentes la decide la memoria, no el pool.
+        self._pool = ThreadPoolExecutor(max_workers=64, thread_name_prefix="proc")
         self.lock = threading.Lock()
+        # Condición sobre el mismo lock: el scheduler duerme hasta que
+        # alguien encola un proceso o libera memoria, en vez de sondear.
+        self._cv = threading.Condition(self.lock)
+        self._wake = False
         self.next_pid = 1
+        self._name_seq = 0
         self._stop = False
+        # Los logs se encolan y un hilo dedicado los escribe por lotes:
+        # el camino caliente del scheduler no toca el lock de stdout
+        self._log_q: queue.SimpleQueue = queue.SimpleQueue()
+        self._log_thread = threading.Thread(target=self._drain_logs, daemon=True)
+        self._log_thread.start()
 
     # ------- Creación / cola -------
     def _gen_pid(self) -> int:
@@ -90,84 +216,235 @@ class Scheduler:
         if pid is None:
             pid = self._gen_pid()
         if not name:
-            name = f"proc-{uuid.uuid4().hex[:6]}"
-        p = Process(pid=pid, name=name, mem_mb=mem_mb, duration_s=duration_s)
-        with self.lock:
-            self.queue.append(p)
-        print(f"[{ts()}] + ADD   PID={p.pid:03d} '{p.name}' mem={p.mem_mb}MB dur={p.duration_s}s -> cola")
+            # Contador monotónico: mismo formato de nombre sin el syscall
+            # de entropía de uuid4 por proceso
+            self._name_seq += 1
+            name = f"proc-{self._name_seq:06x}"
+        if self._proc_pool:
+            p = self._proc_pool.pop()
+            p.pid = pid
+            p.name = name
+            p.mem_mb = mem_mb
+            p.duration_s = duration_s
+            p.state = "WAITING"
+            p.t_start = None
+            p.t_end = None
+        else:
+            p = Process(pid=pid, name=name, mem_mb=mem_mb, duration_s=duration_s)
+        with self._cv:
+            self._by_seq[self._seq] = p
+            heapq.heappush(self.by_mem, (p.mem_mb, self._seq, p.pid))
+            self._seq += 1
+            self._wake = True
+            self._cv.notify_all()
+        self._log(f"+ ADD   PID={p.pid:03d} '{p.name}' mem={p.mem_mb}MB dur={p.duration_s}s -> cola")
         return p
 
+    # ------- Bitmap de ejecución -------
+    def _bit_set(self, pid: int) -> None:
+        if not 0 <= pid < _PID_BITMAP_MAX:
+            # pid arbitrario del usuario: el bitmap nunca debe crecer en
+            # proporción al valor del pid; el listado pasa a usar el dict
+            self._sparse_running = True
+            return
+        idx = pid >> 3
+        if idx >= len(self._running_bits):
+            self._running_bits.extend(bytes(max(idx + 1 - len(self._running_bits), len(self._running_bits))))
+        self._running_bits[idx] |= 1 << (pid & 7)
+
+    def _bit_clear(self, pid: int) -> None:
+        if not 0 <= pid < _PID_BITMAP_MAX:
+            return
+        idx = pid >> 3
+        if idx < len(self._running_bits):
+            self._running_bits[idx] &= ~(1 << (pid & 7)) & 0xFF
+
+    def _running_pids(self) -> List[int]:
+        if self._sparse_running:
+            return list(self.running)
+        pids = []
+        for idx, b in enumerate(self._running_bits):
+            if b:
+                base = idx << 3
+                while b:
+                    low = b & -b
+                    pids.append(base + low.bit_length() - 1)
+                    b ^= low
+        return pids
+
     # ------- Ejecución -------
     def _start_if_possible(self) -> None:
         started_any = False
-        i = 0
-        while i < len(self.queue):
+
+        # Dar de baja los terminados acumulados: una sola adquisición del
+        # lock por pasada en lugar de una por finalización
+        if self._done_q:
             with self.lock:
-                p = self.queue[i]
+                while self._done_q:
+                    pid = self._done_q.popleft()
+                    self.running.pop(pid, None)
+                    self._bit_clear(pid)
+
+        # Cola grande: decidir el corte de admisión por lotes con el kernel
+        # compilado sobre el arreglo plano de memorias, reservar la suma en
+        # una sola operación y arrancar el prefijo completo. Una lista
+        # ordenada sigue cumpliendo el invariante de heap, así que el resto
+        # se reasigna sin heapify.
+        if np is not None and len(self.by_mem) > 64:
+            with self.lock:
+                items = sorted(self.by_mem)
+                mems = np.array([mem for mem, _, _ in items], dtype=np.int64)
+                free_now = self.mm.total_mb - self.mm.used_mb
+                k = int(_admit_cutoff(mems, free_now))
+                if k and self.mm.try_alloc(items[0][2], int(mems[:k].sum())):
+                    self.by_mem = items[k:]
+                else:
+                    k = 0
+            for _, seq, _ in items[:k]:
+                self._admit(self._by_seq.pop(seq))
+                started_any = True
+
+        # Admisión best-fit sobre el heap: mientras el proceso más chico en
+        # memoria quepa, se extrae y arranca; en cuanto el tope no cabe,
+        # ninguno de los demás cabe tampoco (todos piden más). O(log n) por
+        # admisión en lugar de un barrido O(n) de toda la cola.
+        while True:
+            with self.lock:
+                if not self.by_mem:
+                    break
+                item = heapq.heappop(self.by_mem)
+            mem_mb, seq, pid = item
 
             # Proceso nunca ejecutable
-            if p.mem_mb > self.mm.total_mb:
-                print(f"[{ts()}] ! ERROR PID={p.pid:03d} '{p.name}' requiere {p.mem_mb}MB > RAM total {self.mm.total_mb}MB. Se descarta.")
-                with self.lock:
-                    self.queue.remove(p)
+            if mem_mb > self.mm.total_mb:
+                p = self._by_seq.pop(seq)
+                self._log(f"! ERROR PID={p.pid:03d} '{p.name}' requiere {p.mem_mb}MB > RAM total {self.mm.total_mb}MB. Se descarta.")
+                continue
+
+            # Camino rápido: con RAM holgada (más de la mitad libre y un
+            # pedido menor al 10% de lo libre) la reserva no puede fallar,
+            # porque este es el único hilo que asigna y lo libre solo crece:
+            # suma directa en vez del bucle CAS y log sin el estado completo
+            free_now = self.mm.total_mb - self.mm.used_mb
+            if free_now * 2 > self.mm.total_mb and mem_mb * 10 < free_now:
+                self.mm.alloc(pid, mem_mb)
+                self._admit(self._by_seq.pop(seq), fast=True)
+                started_any = True
                 continue
 
             # Proceso puede ejecutarse si hay memoria ahora
-            if self.mm.try_alloc(p.pid, p.mem_mb):
-                with self.lock:
-                    self.queue.remove(p)
-                    p.state = "RUNNING"
-                    p.t_start = time.time()
-                    self.running[p.pid] = p
-                print(f"[{ts()}] > START PID={p.pid:03d} '{p.name}'  usa {p.mem_mb}MB | estado: {self._fmt_state()}")
-                t = threading.Thread(target=self._run_process, args=(p,), daemon=True)
-                self.threads[p.pid] = t
-                t.start()
+            if self.mm.try_alloc(pid, mem_mb):
+                self._admit(self._by_seq.pop(seq))
                 started_any = True
-                continue  # no incrementamos i porque removimos el proceso
-            # No hay memoria suficiente ahora, siguiente en cola
-            i += 1
+                continue
+
+            # No cabe ni el pedido mínimo: devolverlo y esperar liberaciones
+            with self.lock:
+                heapq.heappush(self.by_mem, item)
+            break
 
         return started_any
 
+    def _admit(self, p: Process, fast: bool = False) -> None:
+        with self.lock:
+            p.state = "RUNNING"
+            p.t_start = time.time()
+            self.running[p.pid] = p
+            self._bit_set(p.pid)
+        if fast:
+            # Camino rápido: sin armar el dict de stats ni el estado completo
+            self._log(f"> START PID={p.pid:03d} '{p.name}'  usa {p.mem_mb}MB")
+        else:
+            self._log(f"> START PID={p.pid:03d} '{p.name}'  usa {p.mem_mb}MB | estado: {self._fmt_state()}")
+        # Asegurar un worker libre antes del submit: _run_process arranca
+        # durmiendo la duración, así que un task encolado tras 64 workers
+        # ocupados serializaría procesos que la memoria dejó correr juntos
+        # y correría sus t_start/t_end. len(running) cuenta lo en vuelo
+        # (como mucho de más, nunca de menos), y el executor crea hilos on
+        # demand hasta su tope, así que subir el tope no cuesta nada hasta
+        # que hace falta.
+        if len(self.running) >= self._pool._max_workers:
+            self._pool._max_workers = len(self.running) * 2
+        fut = self._pool.submit(self._run_process, p)
+        self.threads[p.pid] = fut
+
     def _run_process(self, p: Process) -> None:
         time.sleep(p.duration_s)
         p.state = "FINISHED"
         p.t_end = time.time()
         self.mm.free(p.mem_mb)
-        with self.lock:
-            self.running.pop(p.pid, None)
-        print(f"[{ts()}] < END   PID={p.pid:03d} '{p.name}' liberó {p.mem_mb}MB | estado: {self._fmt_state()}")
+        self._done_q.append(p.pid)
+        with self._cv:
+            self._wake = True
+            self._cv.notify_all()
+        self._log(f"< END   PID={p.pid:03d} '{p.name}' liberó {p.mem_mb}MB | estado: {self._fmt_state()}")
+        # Nadie conserva referencias al proceso terminado: vuelve al pool
+        self._proc_pool.append(p)
+
+    # ------- Logging -------
+    def _log(self, msg: str) -> None:
+        self._log_q.put(msg)
+
+    def _drain_logs(self) -> None:
+        while True:
+            batch = [self._log_q.get()]
+            while True:
+                try:
+                    batch.append(self._log_q.get_nowait())
+                except queue.Empty:
+                    break
+            # Un solo timestamp, un solo encode y un solo syscall por lote,
+            # sin pasar por el lock ni el buffer de sys.stdout
+            stamp = ts()
+            stop = batch[-1] is None
+            lines = [f"[{stamp}] {m}" for m in batch if m is not None]
+            if lines:
+                os.write(_STDOUT_FD, ("\n".join(lines) + "\n").encode("utf-8"))
+            if stop:
+                return
 
     def _fmt_state(self) -> str:
         st = self.mm.stats()
         with self.lock:
-            running_pids = list(self.running.keys())
-            qsize = len(self.queue)
+            running_pids = self._running_pids()
+            qsize = len(self.by_mem)
         return f"RAM {st['used_mb']}/{st['total_mb']}MB (libre {st['free_mb']}MB) | running={running_pids} | cola={qsize}"
 
     def run(self) -> None:
-        print(f"[{ts()}] === INICIO DEL SCHEDULER ===")
-        print(f"[{ts()}] {self._fmt_state()}")
+        self._log("=== INICIO DEL SCHEDULER ===")
+        self._log(self._fmt_state())
+        backoff = 0.001
         while not self._stop:
-            self._start_if_possible()
-            with self.lock:
-                nothing_left = (not self.running) and (not self.queue)
-            if nothing_left:
-                break
-            time.sleep(0.1)
-        print(f"[{ts()}] === FIN DEL SCHEDULER ===")
-        print(f"[{ts()}] {self._fmt_state()}")
+            started = self._start_if_possible()
+            if started:
+                backoff = 0.001
+            with self._cv:
+                if (not self.running) and (not self.by_mem):
+                    break
+                # Dormir hasta la próxima señal (encolado o fin de proceso);
+                # el flag _wake evita perder una señal emitida entre el
+                # intento de arranque y este wait. El timeout con backoff
+                # exponencial (1 ms -> 50 ms) acota la espera ante cualquier
+                # señal perdida sin volver al sondeo fijo de 100 ms.
+                if not self._wake:
+                    self._cv.wait(timeout=backoff)
+                    backoff = min(backoff * 2, 0.05)
+                self._wake = False
+        self._pool.shutdown(wait=True)
+        self._log("=== FIN DEL SCHEDULER ===")
+        self._log(self._fmt_state())
+        # Centinela: vaciar lo pendiente y cerrar el hilo de logs
+        self._log_q.put(None)
+        self._log_thread.join()
 
 # -------------------- CLI --------------------
 
+_ADD_RE = re.compile(r"(\w+)\s*=\s*([^,]*)")
+
 def parse_add_arg(arg: str) -> dict:
-    kv = {}
-    for part in arg.split(","):
-        if not part.strip():
-            continue
-        k, _, v = part.partition("=")
-        kv[k.strip()] = v.strip()
+    # Un solo escaneo del patrón clave=valor compilado, en lugar de split
+    # por coma + partition por token (y sus strings intermedios)
+    kv = {k: v.strip() for k, v in _ADD_RE.findall(arg)}
     out = {}
     if "pid" in kv:
         out["pid"] = int(kv["pid"])
@@ -187,7 +464,7 @@ def main():
     mm = MemoryManager(total_mb=args.ram)
     sch = Scheduler(mm)
 
-    # --demo (igual que versión 1)
+    # --demo: lote de ejemplo fijo
     if args.demo:
         sch.add_process("Editor", 200, 5)
         sch.add_process("Compilador", 600, 6)
@@ -199,8 +476,18 @@ def main():
     if args.load:
         if not os.path.exists(args.load):
             raise SystemExit(f"Archivo no encontrado: {args.load}")
-        with open(args.load, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        # mmap evita la copia intermedia de bytes y el decode previo del
+        # modo texto; orjson parsea el buffer directo si está disponible
+        with open(args.load, "rb") as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if orjson is not None:
+                with memoryview(buf) as mv:
+                    data = orjson.loads(mv)
+            else:
+                data = json.loads(buf[:])
+        finally:
+            buf.close()
         if not isinstance(data, list):
             raise SystemExit("JSON debe ser una lista de procesos")
         for item in data: